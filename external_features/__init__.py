@@ -8,11 +8,17 @@ Verfügbare Clients:
 - ExternalFeatureOrchestrator: Koordiniert alle APIs
 """
 
-from .base_client import FeatureAPIClient
-from .holiday_client import HolidayAPIClient
-from .bundesbank_client import BundesbankAPIClient
-from .orchestrator import ExternalFeatureOrchestrator
-from .data_manager import FeatureDataManager
+import importlib
+
+# Lazy Imports: Module werden erst beim ersten Zugriff geladen, damit z.B.
+# FeatureDataManager.list_snapshots() nicht pandas & Co. importieren muss
+_EXPORTS = {
+    'FeatureAPIClient': '.base_client',
+    'HolidayAPIClient': '.holiday_client',
+    'BundesbankAPIClient': '.bundesbank_client',
+    'ExternalFeatureOrchestrator': '.orchestrator',
+    'FeatureDataManager': '.data_manager',
+}
 
 __all__ = [
     'FeatureAPIClient',
@@ -23,3 +29,15 @@ __all__ = [
 ]
 
 __version__ = '1.0.0'
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
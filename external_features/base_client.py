@@ -3,17 +3,58 @@ Base Client für alle External Feature APIs.
 
 Features:
 - File-based Caching (Redis optional)
-- Rate Limiting
+- Rate Limiting (Sliding Window + Retry-After / X-RateLimit Header)
 - Retry Logic mit Exponential Backoff
+- HTTP Connection Pooling (Keep-Alive Session, optional HTTP/2 via httpx)
 - Automatische Fehlerbehandlung
 """
 
-import requests
+import atexit
 import json
+import logging
+import os
+import requests
+import pickle
+import threading
 import time
-from datetime import datetime, timedelta
+import weakref
+import numpy as np
+import pandas as pd
+from requests.adapters import HTTPAdapter
+from collections import deque
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, BinaryIO, Dict, Optional
+
+try:
+    import orjson  # Optional: schneller JSON-Encoder für serializer='json'
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Dateiendungen pro Serializer (DataFrames können als Parquet abgelegt werden)
+CACHE_SUFFIXES = ('.pkl', '.parquet', '.json')
+
+# Sliding Window für Rate Limiting (Sekunden)
+RATE_LIMIT_WINDOW = 60.0
+
+# Komprimierte Responses anfordern (CSV/JSON Text komprimiert sehr gut)
+ACCEPT_ENCODING = 'gzip, deflate'
+
+
+# Offene Clients (schwach referenziert) für den gemeinsamen atexit-Hook
+_live_clients: "weakref.WeakSet[FeatureAPIClient]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_at_exit():
+    """atexit-Hook: schreibt ausstehende Cache-Einträge noch offener Clients."""
+    for client in list(_live_clients):
+        try:
+            client._flush_all()
+        except Exception as e:
+            logger.warning("Cache flush at exit failed: %s", e)
 
 
 class FeatureAPIClient:
@@ -27,121 +68,407 @@ class FeatureAPIClient:
     - Fallback Values
     """
     
-    def __init__(self, cache_dir: str = "./cache", cache_ttl_hours: int = 24):
+    def __init__(self, cache_dir: str = "./cache", cache_ttl_hours: int = 24,
+                 serializer: str = "pickle", flush_interval: float = 5.0,
+                 http2: bool = False, session: Optional[Any] = None):
         """
         Initialisiert den API Client.
         
         Args:
             cache_dir: Verzeichnis für File-based Cache
             cache_ttl_hours: Time-to-Live für Cache in Stunden
+            serializer: Cache-Format ('pickle', 'parquet' oder 'json').
+                'parquet' speichert DataFrames als Parquet (zstd, benötigt pyarrow),
+                'json' speichert kompaktes, lesbares JSON (orjson falls installiert,
+                DataFrames spaltenweise); alles andere wird gepickelt.
+            flush_interval: Cache-Writes werden gesammelt und höchstens alle
+                flush_interval Sekunden auf Disk geschrieben (sowie bei close/Exit)
+            http2: HTTP/2 über httpx verwenden (benötigt httpx[http2]),
+                sonst requests.Session mit HTTP/1.1 Keep-Alive
+            session: Optional bestehende Session (requests.Session oder
+                httpx.Client), die mit anderen Clients geteilt wird; wird von
+                close() nicht geschlossen
         """
+        if serializer not in ('pickle', 'parquet', 'json'):
+            raise ValueError(f"Unbekannter Serializer: {serializer!r} (erlaubt: 'pickle', 'parquet', 'json')")
+        
+        self.serializer = serializer
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
-        self.cache_ttl = timedelta(hours=cache_ttl_hours)
+        self.cache_ttl_seconds = cache_ttl_hours * 3600.0
         self.request_count = 0
-        self.last_request_time = None
         
-    def _get_cache_path(self, key: str) -> Path:
+        # Write-Back Cache: geänderte Keys werden gesammelt und gebündelt geschrieben
+        self.flush_interval = flush_interval
+        self._dirty: Dict[str, Any] = {}
+        # Schützt _dirty und den Flush (get_holidays_multi schreibt aus mehreren Threads)
+        self._cache_lock = threading.RLock()
+        self._last_flush = time.time()
+        _live_clients.add(self)
+        
+        # Rate Limiting: Zeitstempel (monotonic) der Requests im aktuellen Fenster
+        self._request_times = deque()
+        self._blocked_until = 0.0
+        self._rate_lock = threading.Lock()
+        
+        # HTTP Session mit Connection Pooling (Keep-Alive über alle Requests)
+        self._owns_session = session is None
+        if session is None:
+            self.session, self._request_errors = self._create_session(http2)
+        else:
+            self.session, self._request_errors = session, self._session_errors(session)
+        
+    @staticmethod
+    def _create_session(http2: bool = False) -> tuple:
+        """
+        Erstellt die HTTP Session.
+        
+        Returns:
+            (session, Exception-Typen für fehlgeschlagene Requests)
+        """
+        if http2:
+            import httpx  # Optional: nur für HTTP/2
+            
+            client = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=4, max_connections=8),
+                headers={'Accept-Encoding': ACCEPT_ENCODING}
+            )
+            return client, (httpx.HTTPError, requests.exceptions.RequestException)
+        
+        # Retries übernimmt _retry_request, daher max_retries=0 im Adapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Connection': 'keep-alive',
+            'Accept-Encoding': ACCEPT_ENCODING
+        })
+        return session, (requests.exceptions.RequestException,)
+    
+    @staticmethod
+    def _session_errors(session: Any) -> tuple:
+        """Exception-Typen für fehlgeschlagene Requests einer übergebenen Session."""
+        if type(session).__module__.startswith('httpx'):
+            import httpx
+            return (httpx.HTTPError, requests.exceptions.RequestException)
+        return (requests.exceptions.RequestException,)
+    
+    def _get_cache_path(self, key: str, suffix: str = '.pkl') -> Path:
         """Generiert Cache-Pfad für einen Key."""
         # Sanitize key für Filesystem
         safe_key = key.replace('/', '_').replace(':', '_')
-        return self.cache_dir / f"{safe_key}.json"
+        return self.cache_dir / f"{safe_key}{suffix}"
     
-    def _is_cache_valid(self, cache_path: Path) -> bool:
-        """Prüft ob Cache noch gültig ist."""
-        if not cache_path.exists():
-            return False
+    def _open_if_fresh(self, cache_path: Path) -> Optional[BinaryIO]:
+        """
+        Öffnet Cache-Datei, falls vorhanden und innerhalb der TTL.
+        
+        Ein open + fstat statt exists + stat + open.
         
-        mtime = datetime.fromtimestamp(cache_path.stat().st_mtime)
-        return datetime.now() - mtime < self.cache_ttl
+        Returns:
+            Geöffnete Datei (binär) oder None
+        """
+        try:
+            f = open(cache_path, 'rb')
+        except FileNotFoundError:
+            return None
+        
+        if time.time() - os.fstat(f.fileno()).st_mtime < self.cache_ttl_seconds:
+            return f
+        
+        f.close()
+        return None
     
-    def _read_cache(self, key: str) -> Optional[Dict]:
-        """Liest aus Cache."""
-        cache_path = self._get_cache_path(key)
+    def _read_cache(self, key: str) -> Optional[Any]:
+        """Liest aus Cache (Parquet/JSON je nach Serializer, sonst Pickle)."""
+        # Noch nicht geschriebene Einträge zuerst (Read-after-Write); unter dem Lock,
+        # damit ein gerade laufender Flush erst fertig auf Disk geschrieben hat
+        with self._cache_lock:
+            if key in self._dirty:
+                return self._dirty[key]
         
-        if self._is_cache_valid(cache_path):
+        suffixes = ('.pkl',) if self.serializer == 'pickle' else (f'.{self.serializer}', '.pkl')
+        for suffix in suffixes:
+            f = self._open_if_fresh(self._get_cache_path(key, suffix))
+            if f is None:
+                continue
             try:
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with f:
+                    if suffix == '.parquet':
+                        return pd.read_parquet(f)
+                    if suffix == '.json':
+                        return self._load_json(f.read())
+                    return pickle.load(f)
             except Exception as e:
-                print(f"⚠️  Cache read failed: {e}")
+                logger.warning("Cache read failed: %s", e)
                 return None
         return None
     
-    def _write_cache(self, key: str, data: Dict):
-        """Schreibt in Cache."""
-        cache_path = self._get_cache_path(key)
+    def _write_cache(self, key: str, data: Any):
+        """Merkt Eintrag zum Schreiben vor (siehe _maybe_flush)."""
+        with self._cache_lock:
+            self._dirty[key] = data
+    
+    def _maybe_flush(self):
+        """Schreibt ausstehende Einträge, wenn flush_interval abgelaufen ist."""
+        with self._cache_lock:
+            if self._dirty and time.time() - self._last_flush >= self.flush_interval:
+                self._flush_all()
+    
+    def _flush_all(self):
+        """Schreibt alle ausstehenden Cache-Einträge auf Disk."""
+        with self._cache_lock:
+            pending, self._dirty = self._dirty, {}
+            for key, data in pending.items():
+                self._write_to_disk(key, data)
+            self._last_flush = time.time()
+    
+    def _write_to_disk(self, key: str, data: Any):
+        """
+        Schreibt in Cache (binär bzw. kompaktes JSON, ohne Einrückung).
+        
+        Atomar: erst in eine .tmp-Datei, dann per os.replace an den Zielpfad,
+        damit ein abgebrochener Write keinen kaputten Cache hinterlässt.
+        """
+        if self.serializer == 'parquet' and isinstance(data, pd.DataFrame):
+            cache_path = self._get_cache_path(key, '.parquet')
+        elif self.serializer == 'json':
+            cache_path = self._get_cache_path(key, '.json')
+        else:
+            cache_path = self._get_cache_path(key, '.pkl')
+        tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+        
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            if cache_path.suffix == '.parquet':
+                data.to_parquet(tmp_path, compression='zstd', index=False)
+            elif cache_path.suffix == '.json':
+                with open(tmp_path, 'wb') as f:
+                    f.write(self._dump_json(data))
+            else:
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
         except Exception as e:
-            print(f"⚠️  Cache write failed: {e}")
+            logger.warning("Cache write failed: %s", e)
+            try:
+                tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+    
+    @staticmethod
+    def _dump_json(data: Any) -> bytes:
+        """
+        Kompaktes UTF-8 JSON (orjson falls installiert, sonst stdlib).
+        
+        DataFrames werden spaltenweise als Arrays abgelegt (keine Record-Dicts),
+        datetime-Spalten als int64 Nanosekunden.
+        """
+        if isinstance(data, pd.DataFrame):
+            columns = {}
+            datetime_cols = []
+            for col in data.columns:
+                values = data[col].values
+                if np.issubdtype(values.dtype, np.datetime64):
+                    values = values.astype('datetime64[ns]').astype(np.int64)
+                    datetime_cols.append(col)
+                columns[col] = np.ascontiguousarray(values)
+            data = {'__dataframe__': {'columns': columns, 'datetime': datetime_cols}}
+        
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'),
+                          default=lambda o: o.tolist()).encode('utf-8')
+    
+    @staticmethod
+    def _load_json(raw: bytes) -> Any:
+        """Gegenstück zu _dump_json (rekonstruiert DataFrames in einem Schritt)."""
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        
+        if isinstance(data, dict) and '__dataframe__' in data:
+            frame = data['__dataframe__']
+            columns = frame['columns']
+            for col in frame['datetime']:
+                columns[col] = pd.to_datetime(np.asarray(columns[col], dtype=np.int64), unit='ns')
+            return pd.DataFrame(columns)
+        
+        return data
     
     def _rate_limit(self, requests_per_minute: int = 60):
         """
         Rate Limiting: Wartet wenn nötig.
         
+        Sliding Window über die letzten 60 Sekunden: gewartet wird nur, wenn
+        das Fenster voll ist oder der Server per Header gebremst hat.
+        
+        Args:
+            requests_per_minute: Maximale Requests pro Minute
+        """
+        with self._rate_lock:
+            now = time.monotonic()
+            
+            # Server-seitige Sperre (Retry-After)
+            if now < self._blocked_until:
+                time.sleep(self._blocked_until - now)
+                now = time.monotonic()
+            
+            # Abgelaufene Zeitstempel entfernen
+            while self._request_times and now - self._request_times[0] >= RATE_LIMIT_WINDOW:
+                self._request_times.popleft()
+            
+            # Fenster voll: warten bis der älteste Request herausfällt
+            if len(self._request_times) >= requests_per_minute:
+                time.sleep(self._request_times[0] + RATE_LIMIT_WINDOW - now)
+                now = time.monotonic()
+                while self._request_times and now - self._request_times[0] >= RATE_LIMIT_WINDOW:
+                    self._request_times.popleft()
+            
+            self._request_times.append(now)
+            self.request_count += 1
+    
+    def _update_rate_limit(self, response: Any,
+                           requests_per_minute: int = 60, threshold: int = 1):
+        """
+        Reagiert auf Rate-Limit Header der API (Retry-After, X-RateLimit-Remaining).
+        
         Args:
+            response: HTTP Response
             requests_per_minute: Maximale Requests pro Minute
+            threshold: Ab dieser Rest-Anzahl wird proaktiv gedrosselt
         """
-        if self.last_request_time:
-            elapsed = time.time() - self.last_request_time
-            min_interval = 60.0 / requests_per_minute
+        retry_after = self._parse_retry_after(response)
+        
+        with self._rate_lock:
+            now = time.monotonic()
+            if retry_after is not None:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
             
-            if elapsed < min_interval:
-                time.sleep(min_interval - elapsed)
+            remaining = response.headers.get('X-RateLimit-Remaining')
+            if remaining is not None and remaining.strip().isdigit() and int(remaining) <= threshold:
+                reset = self._parse_rate_limit_reset(response)
+                if int(remaining) == 0 and reset is not None:
+                    # Kontingent erschöpft: bis zum angekündigten Reset sperren
+                    self._blocked_until = max(self._blocked_until, now + reset)
+                else:
+                    # Einen synthetischen Request ins Fenster legen → etwas früher drosseln
+                    self._request_times.append(now)
+    
+    @staticmethod
+    def _parse_rate_limit_reset(response: Any) -> Optional[float]:
+        """
+        Liest X-RateLimit-Reset als Sekunden bis zum Reset.
         
-        self.last_request_time = time.time()
-        self.request_count += 1
+        Akzeptiert Sekunden (Delta) oder einen Unix-Timestamp.
+        """
+        value = response.headers.get('X-RateLimit-Reset')
+        if not value or not value.strip().isdigit():
+            return None
+        
+        reset = float(value)
+        if reset > 1e9:  # Unix-Timestamp statt Delta
+            reset -= time.time()
+        return max(0.0, reset)
+    
+    @staticmethod
+    def _parse_retry_after(response: Optional[Any]) -> Optional[float]:
+        """Liest Retry-After (Sekunden oder HTTP-Datum) aus einer Response."""
+        if response is None:
+            return None
+        
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
     
     def _retry_request(self, url: str, max_retries: int = 3, 
-                      backoff: float = 2.0, timeout: int = 10) -> Optional[Dict]:
+                      backoff: float = 2.0, timeout: int = 10,
+                      as_text: bool = False) -> Optional[Any]:
         """
         HTTP Request mit Retry Logic.
         
+        Thread-safe nutzbar: die Session poolt bis zu 8 Verbindungen.
+        
         Args:
             url: API Endpoint URL
             max_retries: Maximale Anzahl Versuche
             backoff: Exponential Backoff Faktor
             timeout: Request Timeout in Sekunden
+            as_text: Rohen Response-Text statt JSON zurückgeben (z.B. CSV)
             
         Returns:
-            JSON Response oder None bei Fehler
+            JSON Response (bzw. Text) oder None bei Fehler
         """
         for attempt in range(max_retries):
             try:
                 self._rate_limit()
-                response = requests.get(url, timeout=timeout)
+                response = self.session.get(url, timeout=timeout)
+                self._update_rate_limit(response)
                 response.raise_for_status()
-                return response.json()
+                return response.text if as_text else response.json()
             
-            except requests.exceptions.RequestException as e:
+            except self._request_errors as e:
                 if attempt == max_retries - 1:
-                    print(f"❌ API Request failed after {max_retries} attempts: {e}")
+                    logger.error("API Request failed after %d attempts: %s", max_retries, e)
                     return None
                 
-                wait_time = backoff ** attempt
-                print(f"⚠️  Retry {attempt + 1}/{max_retries} after {wait_time}s...")
+                # Bei 429 Retry-After respektieren, sonst Exponential Backoff
+                response = getattr(e, 'response', None)
+                retry_after = None
+                if response is not None and response.status_code == 429:
+                    retry_after = self._parse_retry_after(response)
+                wait_time = retry_after if retry_after is not None else backoff ** attempt
+                logger.info("Retry %d/%d after %ss...", attempt + 1, max_retries, wait_time)
                 time.sleep(wait_time)
         
         return None
     
+    def close(self):
+        """Schreibt ausstehende Cache-Einträge und schließt die eigene HTTP Session."""
+        _live_clients.discard(self)
+        self._flush_all()
+        if self._owns_session:
+            self.session.close()
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+    
+    def _cache_files(self) -> list:
+        """Alle Cache-Dateien im Cache-Verzeichnis."""
+        return [f for f in self.cache_dir.iterdir() if f.suffix in CACHE_SUFFIXES]
+    
     def clear_cache(self):
         """Löscht alle Cache-Dateien."""
-        for cache_file in self.cache_dir.glob("*.json"):
-            try:
-                cache_file.unlink()
-            except Exception as e:
-                print(f"⚠️  Failed to delete {cache_file}: {e}")
+        with self._cache_lock:
+            self._dirty.clear()
+            for cache_file in self._cache_files():
+                try:
+                    cache_file.unlink()
+                except Exception as e:
+                    logger.warning("Failed to delete %s: %s", cache_file, e)
     
     def get_cache_stats(self) -> Dict:
         """Gibt Cache-Statistiken zurück."""
-        cache_files = list(self.cache_dir.glob("*.json"))
+        cache_files = self._cache_files()
         total_size = sum(f.stat().st_size for f in cache_files)
         
         return {
             'cache_files': len(cache_files),
+            'pending_writes': len(self._dirty),
             'total_size_mb': total_size / (1024 * 1024),
             'cache_dir': str(self.cache_dir),
-            'ttl_hours': self.cache_ttl.total_seconds() / 3600
+            'serializer': self.serializer,
+            'ttl_hours': self.cache_ttl_seconds / 3600
         }
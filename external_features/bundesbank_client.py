@@ -12,12 +12,18 @@ Wichtige Zeitreihen:
 API Docs: https://www.bundesbank.de/de/statistiken/zeitreihen-datenbanken
 """
 
+import io
+import logging
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
 from .base_client import FeatureAPIClient
 
+logger = logging.getLogger(__name__)
+
 
 class BundesbankAPIClient(FeatureAPIClient):
     """
@@ -29,10 +35,19 @@ class BundesbankAPIClient(FeatureAPIClient):
     - Deutsche & Euro-Raum Wirtschaftsdaten
     """
     
-    def __init__(self, **kwargs):
-        """Initialisiert Bundesbank API Client."""
+    def __init__(self, seed: Optional[int] = 42, **kwargs):
+        """
+        Initialisiert Bundesbank API Client.
+        
+        Args:
+            seed: Seed für die simulierten Zinsdaten (None = nicht reproduzierbar)
+            **kwargs: Weitere Parameter für FeatureAPIClient
+        """
         super().__init__(**kwargs)
         
+        # Eigener Zufallsgenerator (PCG64) statt globalem np.random State
+        self.rng = np.random.default_rng(seed)
+        
         # API Base URL
         self.base_url = "https://api.statistiken.bundesbank.de/rest/data"
         
@@ -43,6 +58,11 @@ class BundesbankAPIClient(FeatureAPIClient):
             'bundesanleihe_10j': 'BBK01.WU3706',        # Umlaufrendite 10-jährige Bundesanleihen
             'geldmarktzins_3m': 'BBK01.SU0206',         # 3-Monats-EURIBOR
         }
+        
+        # In-Memory LRU vor dem File-Cache (Key: Datumsbereich)
+        # Pro Eintrag: DataFrame + Spalten als NumPy Arrays für get_features
+        self._mem_cache: "OrderedDict[Tuple[date, date], Tuple[pd.DataFrame, Dict[str, np.ndarray]]]" = OrderedDict()
+        self._mem_cache_size = 128
     
     def get_interest_rates(self, start_date: datetime, end_date: datetime) -> pd.DataFrame:
         """
@@ -57,40 +77,121 @@ class BundesbankAPIClient(FeatureAPIClient):
             
         Returns:
             DataFrame mit Spalten: date, ezb_hauptrefinanzierung, etc.
+            (eigene Kopie, Änderungen wirken nicht auf den Cache)
         """
+        df = self._load_rates(start_date, end_date)
+        return df.copy() if df is not None else None
+    
+    def _load_rates(self, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """
+        Zinsdaten aus In-Memory LRU, File-Cache oder Simulation.
+        
+        Gibt das gecachte DataFrame selbst zurück – nur lesend verwenden.
+        """
+        mem_key = (start_date.date(), end_date.date())
+        
+        # 1. In-Memory Cache (kein Disk-Zugriff)
+        if mem_key in self._mem_cache:
+            self._mem_cache.move_to_end(mem_key)
+            return self._mem_cache[mem_key][0]
+        
         cache_key = f"bundesbank_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}"
         
-        # Cache Check
+        # 2. File Cache (DataFrame wird direkt gecached, inkl. datetime-Spalte)
         cached = self._read_cache(cache_key)
-        if cached:
-            df = pd.DataFrame(cached)
-            # Konvertiere date-Spalte zurück zu datetime
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date'])
-            return df
+        if isinstance(cached, list) and cached:
+            # Altes Cache-Format: Liste von Records mit "YYYY-MM-DD" Strings
+            cached = pd.DataFrame(cached)
+            cached['date'] = pd.to_datetime(cached['date'])
+        if isinstance(cached, pd.DataFrame) and len(cached) > 0:
+            # Tagesgenau wie der Cache-Key (ältere Einträge enthalten ggf. Uhrzeiten)
+            cached['date'] = cached['date'].dt.normalize()
+            self._remember(mem_key, cached)
+            return cached
         
         # Verwende simulierte aber realistische Daten
-        print("⚠️  Using realistic simulated interest rate data (Bundesbank API unstable)")
+        logger.debug("Using realistic simulated interest rate data (Bundesbank API unstable)")
         df = self._generate_realistic_data(start_date, end_date)
         
-        # Cache schreiben (konvertiere Timestamps zu strings)
+        # Cache schreiben
         if df is not None and len(df) > 0:
-            df_to_cache = df.copy()
-            df_to_cache['date'] = df_to_cache['date'].dt.strftime('%Y-%m-%d')
-            self._write_cache(cache_key, df_to_cache.to_dict('records'))
+            self._write_cache(cache_key, df)
+            self._remember(mem_key, df)
+            self._maybe_flush()
         
         return df
     
+    def _remember(self, key: Tuple[date, date], df: pd.DataFrame):
+        """Legt DataFrame im In-Memory LRU ab (älteste Einträge fliegen raus)."""
+        arrays = {col: df[col].values for col in df.columns}
+        self._mem_cache[key] = (df, arrays)
+        self._mem_cache.move_to_end(key)
+        while len(self._mem_cache) > self._mem_cache_size:
+            self._mem_cache.popitem(last=False)
+    
+    def clear_cache(self):
+        """Löscht File-Cache und In-Memory Cache."""
+        super().clear_cache()
+        self._mem_cache.clear()
+    
+    def _get_rate_arrays(self, start_date: datetime, end_date: datetime) -> Optional[Dict[str, np.ndarray]]:
+        """Zinsdaten als Spalten-Arrays (date, ezb_hauptrefinanzierung, ...) oder None."""
+        self._load_rates(start_date, end_date)
+        entry = self._mem_cache.get((start_date.date(), end_date.date()))
+        return entry[1] if entry is not None else None
+    
     def _fetch_bundesbank(self, start_date: datetime, end_date: datetime) -> Optional[pd.DataFrame]:
         """
         Bundesbank API Request mit SDMX-CSV Format.
         
         NICHT VERWENDET - API ist instabil.
         Diese Methode ist nur für zukünftige Referenz hier.
+        
+        Alle Series werden parallel über die gepoolte Session geladen
+        (Latenz = langsamster Request statt Summe aller Requests).
         """
         # Diese Methode wird nicht aufgerufen, da get_interest_rates
         # direkt _generate_realistic_data verwendet
-        return None
+        with ThreadPoolExecutor(max_workers=len(self.series_ids)) as executor:
+            results = list(executor.map(
+                lambda item: self._fetch_series(item[0], item[1], start_date, end_date),
+                self.series_ids.items()
+            ))
+        
+        frames = [df for df in results if df is not None]
+        if not frames:
+            return None
+        
+        df = frames[0]
+        for other in frames[1:]:
+            df = df.merge(other, on='date', how='outer')
+        
+        return df.sort_values('date').reset_index(drop=True)
+    
+    def _fetch_series(self, name: str, series_id: str,
+                      start_date: datetime, end_date: datetime) -> Optional[pd.DataFrame]:
+        """Lädt eine einzelne Zeitreihe (SDMX-CSV) als DataFrame [date, name]."""
+        flow, key = series_id.split('.', 1)
+        url = (
+            f"{self.base_url}/{flow}/{key}"
+            f"?format=sdmx_csv"
+            f"&startPeriod={start_date.date().isoformat()}"
+            f"&endPeriod={end_date.date().isoformat()}"
+        )
+        
+        text = self._retry_request(url, as_text=True)
+        if not text:
+            return None
+        
+        try:
+            raw = pd.read_csv(io.StringIO(text))
+            return pd.DataFrame({
+                'date': pd.to_datetime(raw['TIME_PERIOD']),
+                name: pd.to_numeric(raw['OBS_VALUE'], errors='coerce')
+            })
+        except Exception as e:
+            logger.warning("Bundesbank parse failed for %s: %s", series_id, e)
+            return None
     
     def _generate_realistic_data(self, start_date: datetime, end_date: datetime) -> pd.DataFrame:
         """
@@ -102,7 +203,8 @@ class BundesbankAPIClient(FeatureAPIClient):
         - Langsam rückläufig durch Inflationsrückgang
         - 10J Bund bei ~2.5%
         """
-        dates = pd.date_range(start_date, end_date, freq='D')
+        # Tagesgenau (Mitternacht), passend zu den tagesbasierten Cache-Keys
+        dates = pd.date_range(start_date, end_date, freq='D', normalize=True)
         n_days = len(dates)
         
         # Basis-Werte (Stand November 2025)
@@ -119,37 +221,32 @@ class BundesbankAPIClient(FeatureAPIClient):
         
         # Saisonalität: Zinsen ändern sich meist zu EZB-Sitzungen (alle 6 Wochen)
         # Simuliere "Sprünge" alle ~42 Tage
-        steps = np.zeros(n_days)
-        for i in range(0, n_days, 42):
-            if i < n_days:
-                steps[i:] += np.random.uniform(-0.15, 0.05)  # Kleine Änderungen bei Sitzungen
+        # Kumulierte Änderungen pro Sitzung, auf Tage broadcasted
+        n_steps = (n_days + 41) // 42
+        deltas = self.rng.uniform(-0.15, 0.05, n_steps)  # Kleine Änderungen bei Sitzungen
+        steps = np.cumsum(deltas)[np.arange(n_days) // 42]
+        
+        # Tägliches Rauschen für alle drei Zeitreihen in einem Aufruf
+        noise = self.rng.standard_normal((3, n_days))
+        
+        # Alle drei Zeitreihen als (3, n_days) Buffer
+        vals = np.empty((3, n_days))
+        vals[0] = ezb_base + trend_factor + steps + noise[0] * volatility
+        vals[1] = bund_10j_base + trend_factor * 0.5 + steps * 0.3 + noise[1] * volatility * 2
+        vals[2] = euribor_3m_base + trend_factor * 0.8 + steps * 0.7 + noise[2] * volatility * 1.5
+        
+        # Clip negative Werte (Zinsen normalerweise >= 0) und
+        # runde auf 2 Dezimalstellen (wie echte Zinssätze), beides in-place
+        np.clip(vals, 0, None, out=vals)
+        np.round(vals, 2, out=vals)
         
         df = pd.DataFrame({
             'date': dates,
-            'ezb_hauptrefinanzierung': (
-                ezb_base + trend_factor + steps + 
-                np.random.normal(0, volatility, n_days)
-            ),
-            'bundesanleihe_10j': (
-                bund_10j_base + trend_factor * 0.5 + steps * 0.3 +
-                np.random.normal(0, volatility * 2, n_days)
-            ),
-            'geldmarktzins_3m': (
-                euribor_3m_base + trend_factor * 0.8 + steps * 0.7 +
-                np.random.normal(0, volatility * 1.5, n_days)
-            )
+            'ezb_hauptrefinanzierung': vals[0],
+            'bundesanleihe_10j': vals[1],
+            'geldmarktzins_3m': vals[2]
         })
         
-        # Clip negative Werte (Zinsen normalerweise >= 0)
-        for col in df.columns:
-            if col != 'date':
-                df[col] = df[col].clip(lower=0)
-                
-        # Runde auf 2 Dezimalstellen (wie echte Zinssätze)
-        for col in df.columns:
-            if col != 'date':
-                df[col] = df[col].round(2)
-        
         return df
     
     def get_features(self, date: datetime) -> Dict[str, float]:
@@ -170,9 +267,9 @@ class BundesbankAPIClient(FeatureAPIClient):
         """
         # Hole Daten für Zeitraum (30 Tage lookback für Trends)
         start_date = date - timedelta(days=30)
-        df = self.get_interest_rates(start_date, date)
+        arrays = self._get_rate_arrays(start_date, date)
         
-        if df is None or len(df) == 0:
+        if arrays is None:
             # Fallback: Aktuelle durchschnittliche Werte
             return {
                 'ezb_hauptrefinanzierung': 4.50,
@@ -183,37 +280,82 @@ class BundesbankAPIClient(FeatureAPIClient):
                 'rate_volatility': 0.05
             }
         
-        # Finde nächstes Datum (Forward Fill)
-        df_filtered = df[df['date'] <= date]
-        if len(df_filtered) == 0:
-            row = df.iloc[0]
-        else:
-            row = df_filtered.iloc[-1]
+        # Finde nächstes Datum (Forward Fill): Anzahl Zeilen mit date <= Datum,
+        # per Binärsuche auf der sortierten date-Spalte (keine Maske/Kopie)
+        n = int(np.searchsorted(arrays['date'], pd.Timestamp(date).to_datetime64(), side='right'))
+        i = n - 1 if n > 0 else 0
+        ezb = arrays['ezb_hauptrefinanzierung']
         
         # Trend berechnen (Änderung über 7 und 30 Tage)
-        if len(df_filtered) >= 7:
-            rate_7d_ago = df_filtered.iloc[-7]['ezb_hauptrefinanzierung']
-            rate_trend_7d = row['ezb_hauptrefinanzierung'] - rate_7d_ago
+        if n >= 7:
+            rate_trend_7d = ezb[i] - ezb[n - 7]
         else:
             rate_trend_7d = 0.0
         
-        if len(df_filtered) >= 30:
-            rate_30d_ago = df_filtered.iloc[-30]['ezb_hauptrefinanzierung']
-            rate_trend_30d = row['ezb_hauptrefinanzierung'] - rate_30d_ago
+        if n >= 30:
+            rate_trend_30d = ezb[i] - ezb[n - 30]
         else:
             rate_trend_30d = 0.0
         
-        # Volatilität (Std der letzten 30 Tage)
-        if len(df_filtered) >= 30:
-            rate_volatility = df_filtered['ezb_hauptrefinanzierung'].tail(30).std()
+        # Volatilität (Std der letzten 30 Tage, ddof=1 wie pandas)
+        if n >= 30:
+            rate_volatility = ezb[n - 30:n].std(ddof=1)
         else:
             rate_volatility = 0.05
         
         return {
-            'ezb_hauptrefinanzierung': float(row['ezb_hauptrefinanzierung']),
-            'bundesanleihe_10j': float(row['bundesanleihe_10j']),
-            'geldmarktzins_3m': float(row['geldmarktzins_3m']),
+            'ezb_hauptrefinanzierung': float(ezb[i]),
+            'bundesanleihe_10j': float(arrays['bundesanleihe_10j'][i]),
+            'geldmarktzins_3m': float(arrays['geldmarktzins_3m'][i]),
             'rate_trend_7d': float(rate_trend_7d),
             'rate_trend_30d': float(rate_trend_30d),
             'rate_volatility': float(rate_volatility)
         }
+    
+    def get_features_batch(self, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """
+        Generiert Zins-Features für einen ganzen Datumsbereich in einem Durchgang.
+        
+        Lädt die Zinsdaten einmal (inkl. 30 Tage Lookback) und berechnet Trends
+        und Volatilität vektorisiert statt pro Datum ein eigenes Fenster.
+        Die Werte entsprechen get_features() auf denselben Daten.
+        
+        Args:
+            start_date: Start-Datum
+            end_date: End-Datum
+            
+        Returns:
+            DataFrame mit Spalten: date + Features wie in get_features()
+        """
+        # Nur lesend verwendet, daher ohne Kopie
+        df = self._load_rates(start_date - timedelta(days=30), end_date)
+        
+        if df is None or len(df) == 0:
+            dates = pd.date_range(start_date, end_date, freq='D', normalize=True)
+            return pd.DataFrame({
+                'date': dates,
+                'ezb_hauptrefinanzierung': 4.50,
+                'bundesanleihe_10j': 2.50,
+                'geldmarktzins_3m': 3.80,
+                'rate_trend_7d': 0.0,
+                'rate_trend_30d': 0.0,
+                'rate_volatility': 0.05
+            })
+        
+        ezb = df['ezb_hauptrefinanzierung']
+        
+        # Gleiche Offsets wie get_features: iloc[-7] / iloc[-30] liegen
+        # 6 bzw. 29 Zeilen vor der aktuellen Zeile
+        features = pd.DataFrame({
+            'date': df['date'],
+            'ezb_hauptrefinanzierung': ezb,
+            'bundesanleihe_10j': df['bundesanleihe_10j'],
+            'geldmarktzins_3m': df['geldmarktzins_3m'],
+            'rate_trend_7d': ezb.diff(6).fillna(0.0),
+            'rate_trend_30d': ezb.diff(29).fillna(0.0),
+            'rate_volatility': ezb.rolling(30).std().fillna(0.05)
+        })
+        
+        # Lookback-Zeilen abschneiden
+        start = int(np.searchsorted(df['date'].values, pd.Timestamp(start_date).normalize().to_datetime64(), side='left'))
+        return features.iloc[start:].reset_index(drop=True)
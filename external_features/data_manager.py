@@ -1,16 +1,28 @@
 """
 Data Manager für Hybrid-Strategie.
 
-Verwaltet Feature-Export als finale CSV-Snapshots.
-Trennt Development (Cache) von Production (CSV).
+Verwaltet Feature-Export als finale Snapshots (Parquet, optional CSV).
+Trennt Development (Cache) von Production (Snapshots).
 """
 
-import pandas as pd
-from datetime import datetime
+import csv
+import logging
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Optional, List
+from typing import TYPE_CHECKING, Literal, Optional, List
 import os
 
+# pandas/pyarrow werden erst in den Methoden importiert, die sie brauchen:
+# list_snapshots/snapshot_info kommen so ohne pandas aus
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# Snapshot-Formate in Lade-Priorität
+SNAPSHOT_SUFFIXES = ('.parquet', '.csv')
+
 
 class FeatureDataManager:
     """
@@ -18,40 +30,47 @@ class FeatureDataManager:
     
     Strategie:
     - Development: Automatisches Caching (cache/)
-    - Production: Finale CSV-Snapshots (data/)
+    - Production: Finale Snapshots (data/, Parquet oder CSV)
     """
     
-    def __init__(self, data_dir: str = "./data"):
+    def __init__(self, data_dir: str = "./data", verbose: bool = True):
         """
         Initialisiert Data Manager.
         
         Args:
-            data_dir: Verzeichnis für finale CSV-Exports
+            data_dir: Verzeichnis für finale Snapshot-Exports
+            verbose: Zusammenfassungen (Export, Laden, Kombinieren) ausgeben
         """
         self.data_dir = Path(data_dir)
+        self.verbose = verbose
         self.data_dir.mkdir(exist_ok=True)
         
     def export_training_snapshot(
         self,
-        features_df: pd.DataFrame,
+        features_df: "pd.DataFrame",
         name: str = "training",
-        overwrite: bool = False
+        overwrite: bool = False,
+        format: Literal['parquet', 'csv'] = 'parquet'
     ) -> Path:
         """
-        Exportiert finales Training-Dataset als CSV-Snapshot.
+        Exportiert finales Training-Dataset als Snapshot.
         
         Args:
             features_df: Feature DataFrame
             name: Name des Snapshots (z.B. "training", "test", "2024_Q1")
             overwrite: Existierende Datei überschreiben?
+            format: 'parquet' (zstd, Default) oder 'csv' (menschenlesbar)
             
         Returns:
-            Path zum exportierten CSV
+            Path zum exportierten Snapshot
             
         Raises:
             FileExistsError: Wenn Datei existiert und overwrite=False
         """
-        filename = f"external_features_{name}.csv"
+        if format not in ('parquet', 'csv'):
+            raise ValueError(f"Unbekanntes Format: {format!r} (erlaubt: 'parquet', 'csv')")
+        
+        filename = f"external_features_{name}.{format}"
         filepath = self.data_dir / filename
         
         # Check if exists
@@ -63,26 +82,32 @@ class FeatureDataManager:
             )
         
         # Export
-        features_df.to_csv(filepath, index=False)
+        if format == 'parquet':
+            features_df.to_parquet(filepath, compression='zstd', engine='pyarrow', index=False)
+        else:
+            features_df.to_csv(filepath, index=False)
         
         # Stats
         file_size = os.path.getsize(filepath) / 1024  # KB
         
-        print("="*70)
-        print("✅ SNAPSHOT EXPORTIERT")
-        print("="*70)
-        print(f"Datei:     {filepath}")
-        print(f"Shape:     {features_df.shape}")
-        print(f"Größe:     {file_size:.1f} KB")
-        print(f"Zeitraum:  {features_df['date'].min()} bis {features_df['date'].max()}")
-        print("\n💡 Nächste Schritte:")
-        print(f"   1. git add {filepath}")
-        print(f"   2. git commit -m 'Add {name} feature snapshot'")
-        print(f"   3. git push origin main")
+        logger.info("Snapshot exported: %s %s", filepath, features_df.shape)
+        
+        if self.verbose:
+            print("="*70)
+            print("✅ SNAPSHOT EXPORTIERT")
+            print("="*70)
+            print(f"Datei:     {filepath}")
+            print(f"Shape:     {features_df.shape}")
+            print(f"Größe:     {file_size:.1f} KB")
+            print(f"Zeitraum:  {features_df['date'].min()} bis {features_df['date'].max()}")
+            print("\n💡 Nächste Schritte:")
+            print(f"   1. git add {filepath}")
+            print(f"   2. git commit -m 'Add {name} feature snapshot'")
+            print(f"   3. git push origin main")
         
         return filepath
     
-    def load_snapshot(self, name: str) -> pd.DataFrame:
+    def load_snapshot(self, name: str) -> "pd.DataFrame":
         """
         Lädt einen existierenden Snapshot.
         
@@ -95,20 +120,27 @@ class FeatureDataManager:
         Raises:
             FileNotFoundError: Wenn Snapshot nicht existiert
         """
-        filename = f"external_features_{name}.csv"
-        filepath = self.data_dir / filename
+        import pandas as pd
         
-        if not filepath.exists():
+        filepath = self._snapshot_path(name)
+        
+        if filepath is None:
             raise FileNotFoundError(
-                f"❌ Snapshot nicht gefunden: {filepath}\n"
+                f"❌ Snapshot nicht gefunden: {self.data_dir / f'external_features_{name}.parquet'}\n"
                 f"   Verfügbare Snapshots: {self.list_snapshots()}"
             )
         
-        df = pd.read_csv(filepath, parse_dates=['date'])
+        if filepath.suffix == '.parquet':
+            df = pd.read_parquet(filepath, engine='pyarrow')
+        else:
+            df = pd.read_csv(filepath, parse_dates=['date'])
+        
+        logger.info("Snapshot loaded: %s %s", name, df.shape)
         
-        print(f"✅ Snapshot geladen: {name}")
-        print(f"   Shape: {df.shape}")
-        print(f"   Zeitraum: {df['date'].min()} bis {df['date'].max()}")
+        if self.verbose:
+            print(f"✅ Snapshot geladen: {name}")
+            print(f"   Shape: {df.shape}")
+            print(f"   Zeitraum: {df['date'].min()} bis {df['date'].max()}")
         
         return df
     
@@ -119,23 +151,28 @@ class FeatureDataManager:
         Returns:
             Liste von Snapshot-Namen
         """
-        pattern = "external_features_*.csv"
-        files = list(self.data_dir.glob(pattern))
-        
-        # Extract names
-        names = []
-        for f in files:
-            # external_features_training.csv → training
-            name = f.stem.replace("external_features_", "")
-            names.append(name)
+        names = set()
+        for suffix in SNAPSHOT_SUFFIXES:
+            for f in self.data_dir.glob(f"external_features_*{suffix}"):
+                # external_features_training.parquet → training
+                names.add(f.stem.replace("external_features_", ""))
         
         return sorted(names)
     
+    def _snapshot_path(self, name: str) -> Optional[Path]:
+        """Pfad eines Snapshots (Parquet bevorzugt, sonst CSV) oder None."""
+        for suffix in SNAPSHOT_SUFFIXES:
+            filepath = self.data_dir / f"external_features_{name}{suffix}"
+            if filepath.exists():
+                return filepath
+        return None
+    
     def create_combined_dataset(
         self,
         retail_csv: str,
         feature_snapshot: str,
-        output_name: str = "combined_training"
+        output_name: str = "combined_training",
+        chunksize: int = 200_000
     ) -> Path:
         """
         Kombiniert Retail-Daten mit Feature-Snapshot.
@@ -144,36 +181,48 @@ class FeatureDataManager:
             retail_csv: Pfad zu retail_store_inventory.csv
             feature_snapshot: Name des Feature-Snapshots
             output_name: Name des Output-CSV
+            chunksize: Zeilen pro Chunk beim Einlesen der Retail-Daten
             
         Returns:
             Path zum kombinierten Dataset
         """
-        # Load retail data
-        df_retail = pd.read_csv(retail_csv)
-        df_retail['Date'] = pd.to_datetime(df_retail['Date'])
+        import pandas as pd
         
-        # Load features
+        # Load features (klein, bleibt für alle Chunks im Speicher)
         df_features = self.load_snapshot(feature_snapshot)
         
-        # Merge
-        df_combined = df_retail.merge(
-            df_features,
-            left_on='Date',
-            right_on='date',
-            how='left'
-        )
-        
-        # Export
+        # Retail-Daten chunkweise mergen und anhängen (Peak-RAM ~ chunksize)
         output_file = self.data_dir / f"{output_name}.csv"
-        df_combined.to_csv(output_file, index=False)
+        reader = pd.read_csv(retail_csv, parse_dates=['Date'], chunksize=chunksize)
         
-        print("="*70)
-        print("✅ KOMBINIERTES DATASET ERSTELLT")
-        print("="*70)
-        print(f"Retail Data:  {df_retail.shape}")
-        print(f"Features:     {df_features.shape}")
-        print(f"Combined:     {df_combined.shape}")
-        print(f"Output:       {output_file}")
+        retail_rows = 0
+        combined_rows = 0
+        retail_cols = combined_cols = 0
+        
+        for i, chunk in enumerate(reader):
+            merged = chunk.merge(
+                df_features,
+                left_on='Date',
+                right_on='date',
+                how='left'
+            )
+            merged.to_csv(output_file, mode='w' if i == 0 else 'a',
+                          header=(i == 0), index=False)
+            
+            retail_rows += len(chunk)
+            combined_rows += len(merged)
+            retail_cols, combined_cols = chunk.shape[1], merged.shape[1]
+        
+        logger.info("Combined dataset written: %s (%d rows)", output_file, combined_rows)
+        
+        if self.verbose:
+            print("="*70)
+            print("✅ KOMBINIERTES DATASET ERSTELLT")
+            print("="*70)
+            print(f"Retail Data:  {(retail_rows, retail_cols)}")
+            print(f"Features:     {df_features.shape}")
+            print(f"Combined:     {(combined_rows, combined_cols)}")
+            print(f"Output:       {output_file}")
         
         return output_file
     
@@ -191,12 +240,78 @@ class FeatureDataManager:
             return
         
         for name in snapshots:
-            filepath = self.data_dir / f"external_features_{name}.csv"
-            df = pd.read_csv(filepath, parse_dates=['date'])
+            filepath = self._snapshot_path(name)
             file_size = os.path.getsize(filepath) / 1024
             
-            print(f"\n📄 {name}")
-            print(f"   Shape:     {df.shape}")
-            print(f"   Zeitraum:  {df['date'].min().date()} bis {df['date'].max().date()}")
+            shape, columns, date_min, date_max = self._snapshot_stats(filepath)
+            
+            print(f"\n📄 {name} ({filepath.suffix[1:]})")
+            print(f"   Shape:     {shape}")
+            print(f"   Zeitraum:  {date_min} bis {date_max}")
             print(f"   Größe:     {file_size:.1f} KB")
-            print(f"   Columns:   {', '.join(df.columns[:5])}...")
+            print(f"   Columns:   {', '.join(columns[:5])}...")
+    
+    def _snapshot_stats(self, filepath: Path) -> tuple:
+        """
+        Shape, Spalten und Zeitraum eines Snapshots, ohne ihn komplett zu laden.
+        
+        Parquet: nur Footer-Metadaten (Row Count + min/max Statistiken je Row Group).
+        CSV: Header + date-Spalte (pyarrow.csv, kein pandas).
+        
+        Returns:
+            (shape, columns, date_min, date_max)
+        """
+        import pyarrow.compute as pc
+        
+        if filepath.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            
+            parquet_file = pq.ParquetFile(filepath)
+            metadata = parquet_file.metadata
+            columns = metadata.schema.names
+            shape = (metadata.num_rows, len(columns))
+            date_type = parquet_file.schema_arrow.field('date').type
+            
+            date_idx = columns.index('date')
+            stats = [metadata.row_group(i).column(date_idx).statistics
+                     for i in range(metadata.num_row_groups)]
+            if stats and all(st is not None and st.has_min_max for st in stats):
+                date_min = min(_raw_to_date(st.min_raw, date_type) for st in stats)
+                date_max = max(_raw_to_date(st.max_raw, date_type) for st in stats)
+                return shape, columns, date_min, date_max
+            
+            # Keine Statistiken geschrieben: nur die date-Spalte lesen
+            dates = parquet_file.read(columns=['date'])['date']
+        else:
+            import pyarrow.csv as pa_csv
+            
+            with open(filepath, newline='', encoding='utf-8') as f:
+                columns = next(csv.reader(f))
+            dates = pa_csv.read_csv(
+                filepath,
+                convert_options=pa_csv.ConvertOptions(include_columns=['date'])
+            )['date']
+            shape = (len(dates), len(columns))
+        
+        min_max = pc.min_max(dates)
+        date_min = _raw_to_date(min_max['min'].value, dates.type)
+        date_max = _raw_to_date(min_max['max'].value, dates.type)
+        
+        return shape, columns, date_min, date_max
+
+
+_EPOCH = datetime(1970, 1, 1)
+_TICKS_PER_SECOND = {'s': 1, 'ms': 10**3, 'us': 10**6, 'ns': 10**9}
+
+
+def _raw_to_date(raw, arrow_type) -> date:
+    """
+    Roher Arrow-Wert (timestamp-Ticks bzw. date32-Tage) → date.
+    
+    Ohne Arrow-Scalar-Konvertierung, die für timestamp[ns] pandas importiert.
+    """
+    if isinstance(raw, date):
+        return raw
+    if hasattr(arrow_type, 'unit'):
+        return (_EPOCH + timedelta(seconds=raw // _TICKS_PER_SECOND[arrow_type.unit])).date()
+    return _EPOCH.date() + timedelta(days=raw)
@@ -6,10 +6,16 @@ Fallback: Calendarific (API Key, 1000/Monat)
 Local Fallback: Manuelle Feiertags-Liste
 """
 
+import bisect
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
 from .base_client import FeatureAPIClient
 
+logger = logging.getLogger(__name__)
+
 
 class HolidayAPIClient(FeatureAPIClient):
     """
@@ -44,6 +50,13 @@ class HolidayAPIClient(FeatureAPIClient):
             "12-26": "2. Weihnachtstag",
             "12-31": "Silvester"
         }
+        
+        # In-Process Memo vor dem Datei-Cache: Jahr -> Feiertage
+        self._mem: Dict[int, List[Dict]] = {}
+        
+        # Pro Jahr: (Ordinal-Set, sortiertes Ordinal-Tuple, sortierte Ordinals als int32)
+        # Set für is_holiday, Tuple für bisect im Einzel-Lookup, Array für vektorisierte Pfade
+        self._year_cache: Dict[int, Tuple[FrozenSet[int], Tuple[int, ...], np.ndarray]] = {}
     
     def get_holidays(self, year: int) -> List[Dict]:
         """
@@ -55,11 +68,16 @@ class HolidayAPIClient(FeatureAPIClient):
         Returns:
             Liste von {date: "YYYY-MM-DD", name: "...", type: "public/bank"}
         """
+        # 0. In-Process Memo (kein Datei-Zugriff bei wiederholten Jahren)
+        if year in self._mem:
+            return self._mem[year]
+        
         cache_key = f"holidays_{self.country_code}_{year}"
         
         # 1. Cache Check
         cached = self._read_cache(cache_key)
         if cached:
+            self._mem[year] = cached
             return cached
         
         # 2. Primary API: Nager.Date (kostenlos)
@@ -71,15 +89,40 @@ class HolidayAPIClient(FeatureAPIClient):
         
         # 4. Last Fallback: Manuelle Liste
         if not holidays:
-            print(f"⚠️  Using Fallback Holidays for {year}")
+            logger.info("Using Fallback Holidays for %s", year)
             holidays = self._generate_fallback_holidays(year)
         
         # Cache schreiben
         if holidays:
             self._write_cache(cache_key, holidays)
+            self._mem[year] = holidays
+            self._maybe_flush()
         
         return holidays or []
     
+    def get_holidays_multi(self, years: Iterable[int], max_workers: int = 8) -> Dict[int, List[Dict]]:
+        """
+        Holt Feiertage für mehrere Jahre.
+        
+        Nicht gecachte Jahre werden parallel über die gemeinsame Session
+        abgerufen, sodass mehrere Jahre ungefähr eine Round-Trip-Zeit kosten.
+        
+        Args:
+            years: Jahre (z.B. range(2015, 2026))
+            max_workers: Maximale Anzahl paralleler Requests
+            
+        Returns:
+            {Jahr: Liste von Feiertagen wie get_holidays()}
+        """
+        years = sorted(set(years))
+        missing = [year for year in years if year not in self._mem]
+        
+        if len(missing) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+                list(executor.map(self.get_holidays, missing))
+        
+        return {year: self.get_holidays(year) for year in years}
+    
     def _fetch_nager_date(self, year: int) -> Optional[List[Dict]]:
         """Nager.Date API (kostenlos, keine API Key)."""
         url = f"https://date.nager.at/api/v3/PublicHolidays/{year}/{self.country_code}"
@@ -96,7 +139,7 @@ class HolidayAPIClient(FeatureAPIClient):
                     for h in data
                 ]
         except Exception as e:
-            print(f"❌ Nager.Date failed: {e}")
+            logger.warning("Nager.Date failed: %s", e)
         
         return None
     
@@ -119,7 +162,7 @@ class HolidayAPIClient(FeatureAPIClient):
                     for h in data["response"]["holidays"]
                 ]
         except Exception as e:
-            print(f"❌ Calendarific failed: {e}")
+            logger.warning("Calendarific failed: %s", e)
         
         return None
     
@@ -137,13 +180,52 @@ class HolidayAPIClient(FeatureAPIClient):
         
         return holidays
     
-    def is_holiday(self, date: datetime) -> bool:
-        """Prüft ob Datum ein Feiertag ist."""
-        year = date.year
-        holidays = self.get_holidays(year)
+    def _year_index(self, year: int) -> Tuple[FrozenSet[int], Tuple[int, ...], np.ndarray]:
+        """
+        Feiertags-Index für ein Jahr (memoized).
+        
+        Die sortierten Ordinals liegen zusätzlich als kompaktes int32-Array im
+        Cache (holidays_ords_<cc>_<year>), damit für Lookups die Liste der
+        Feiertags-Dicts nicht geladen werden muss.
+        
+        Returns:
+            (frozenset der date.toordinal(), dieselben sortiert als Tuple und als int32-Array)
+        """
+        index = self._year_cache.get(year)
+        if index is not None:
+            return index
         
-        date_str = date.strftime("%Y-%m-%d")
-        return any(h["date"] == date_str for h in holidays)
+        ords_key = f"holidays_ords_{self.country_code}_{year}"
+        ordinals = self._read_cache(ords_key)
+        
+        if ordinals is not None:
+            # JSON-Cache liefert eine Liste, Pickle das Array
+            ordinals = np.asarray(ordinals, dtype=np.int32)
+            day_set = frozenset(int(o) for o in ordinals)
+        else:
+            holidays = self.get_holidays(year)
+            day_set = frozenset(datetime.fromisoformat(h["date"]).toordinal() for h in holidays)
+            ordinals = np.array(sorted(day_set), dtype=np.int32)
+            self._write_cache(ords_key, ordinals)
+            self._maybe_flush()
+        
+        index = (day_set, tuple(int(o) for o in ordinals), ordinals)
+        self._year_cache[year] = index
+        return index
+    
+    def _year_ordinals(self, year: int) -> np.ndarray:
+        """Sortierte Feiertage eines Jahres als date.toordinal() (int32, memoized)."""
+        return self._year_index(year)[2]
+    
+    def clear_cache(self):
+        """Löscht Cache inkl. In-Process Memo und Feiertags-Index."""
+        self._mem.clear()
+        self._year_cache.clear()
+        super().clear_cache()
+    
+    def is_holiday(self, date: datetime) -> bool:
+        """Prüft ob Datum ein Feiertag ist (date, datetime oder pd.Timestamp)."""
+        return date.toordinal() in self._year_index(date.year)[0]
     
     def get_features(self, date: datetime) -> Dict[str, float]:
         """
@@ -160,18 +242,20 @@ class HolidayAPIClient(FeatureAPIClient):
                 'is_holiday_week': 1/0
             }
         """
-        holidays = self.get_holidays(date.year)
-        holiday_dates = [datetime.strptime(h["date"], "%Y-%m-%d") for h in holidays]
+        # Python-Tuple statt Array: bisect ohne NumPy-Scalar pro Vergleich
+        ordinals = self._year_index(date.year)[1]
+        day = date.toordinal()
         
-        is_holiday = self.is_holiday(date)
+        # Nächster Feiertag (erster >= Tag)
+        nxt = bisect.bisect_left(ordinals, day)
+        days_to_next = ordinals[nxt] - day if nxt < len(ordinals) else 365
         
-        # Nächster Feiertag
-        future_holidays = [h for h in holiday_dates if h >= date]
-        days_to_next = (future_holidays[0] - date).days if future_holidays else 365
+        # Feiertag genau dann, wenn der nächste Feiertag heute ist
+        is_holiday = days_to_next == 0
         
-        # Letzter Feiertag
-        past_holidays = [h for h in holiday_dates if h <= date]
-        days_since_last = (date - past_holidays[-1]).days if past_holidays else 365
+        # Letzter Feiertag (letzter <= Tag)
+        prv = bisect.bisect_right(ordinals, day) - 1
+        days_since_last = day - ordinals[prv] if prv >= 0 else 365
         
         # Holiday Week (7 Tage vor/nach Feiertag)
         is_holiday_week = days_to_next <= 7 or days_since_last <= 7
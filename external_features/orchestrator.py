@@ -12,12 +12,66 @@ Optimiert für:
 - Fehlerresilienz (Fallbacks)
 """
 
+import logging
+import time
+import numpy as np
 import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple
+from .base_client import FeatureAPIClient
 from .holiday_client import HolidayAPIClient
 from .bundesbank_client import BundesbankAPIClient
 
+logger = logging.getLogger(__name__)
+
+# date.toordinal() von 1970-01-01 (Offset zwischen datetime64[D] und Ordinals)
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+# Nach einem API-Fehler wird der Client so lange (Sekunden) übersprungen
+DEGRADED_SECONDS = 60.0
+
+# Fallback-Werte bei API-Fehlern (read-only, einmal pro Prozess)
+_HOLIDAY_FALLBACK = MappingProxyType({
+    'is_holiday': 0.0,
+    'days_to_next_holiday': 30.0,
+    'days_since_last_holiday': 30.0,
+    'is_holiday_week': 0.0
+})
+_INTEREST_FALLBACK = MappingProxyType({
+    'ezb_hauptrefinanzierung': 4.50,
+    'bundesanleihe_10j': 2.50,
+    'geldmarktzins_3m': 3.80,
+    'rate_trend_7d': 0.0,
+    'rate_trend_30d': 0.0,
+    'rate_volatility': 0.05
+})
+
+_TIME_FEATURE_NAMES = (
+    'day_of_week', 'day_of_month', 'month', 'quarter',
+    'is_weekend', 'is_month_start', 'is_month_end', 'week_of_year'
+)
+
+
+def _time_features(date: datetime) -> Dict[str, float]:
+    """Zeitbasierte Features (ohne API) für ein einzelnes Datum."""
+    weekday = date.weekday()
+    day = date.day
+    month = date.month
+    values = (
+        float(weekday),
+        float(day),
+        float(month),
+        float((month - 1) // 3 + 1),
+        float(weekday >= 5),
+        float(day <= 7),
+        float(day >= 24),
+        float(date.isocalendar()[1])
+    )
+    return dict(zip(_TIME_FEATURE_NAMES, values))
+
 
 class ExternalFeatureOrchestrator:
     """
@@ -30,6 +84,16 @@ class ExternalFeatureOrchestrator:
     - Parallel Fetching für Performance
     """
     
+    # Feste Spaltenreihenfolge aller Features (ohne 'date');
+    # muss zu den Keys von get_features_for_date passen
+    FEATURE_NAMES = (
+        'is_holiday', 'days_to_next_holiday', 'days_since_last_holiday', 'is_holiday_week',
+        'ezb_hauptrefinanzierung', 'bundesanleihe_10j', 'geldmarktzins_3m',
+        'rate_trend_7d', 'rate_trend_30d', 'rate_volatility',
+        'day_of_week', 'day_of_month', 'month', 'quarter',
+        'is_weekend', 'is_month_start', 'is_month_end', 'week_of_year'
+    )
+    
     def __init__(self, 
                  holiday_client: Optional[HolidayAPIClient] = None,
                  interest_client: Optional[BundesbankAPIClient] = None,
@@ -42,8 +106,42 @@ class ExternalFeatureOrchestrator:
             interest_client: Optional BundesbankAPIClient (sonst Default)
             country_code: ISO Country Code (z.B. "DE")
         """
-        self.holiday_client = holiday_client or HolidayAPIClient(country_code=country_code)
-        self.interest_client = interest_client or BundesbankAPIClient()
+        # Eine gemeinsame Session (Connection Pool) für alle Default-Clients,
+        # damit Keep-Alive-Verbindungen über Clients und Jahre wiederverwendet werden
+        self._session = None
+        if holiday_client is None or interest_client is None:
+            self._session, _ = FeatureAPIClient._create_session()
+        
+        self.holiday_client = holiday_client or HolidayAPIClient(
+            country_code=country_code, session=self._session
+        )
+        self.interest_client = interest_client or BundesbankAPIClient(session=self._session)
+        
+        # Nur selbst erzeugte Clients werden von close() geschlossen
+        self._owned_clients = [
+            client for client, given in ((self.holiday_client, holiday_client),
+                                         (self.interest_client, interest_client))
+            if given is None
+        ]
+        
+        # LRU-Memo für get_features_for_date: Datum (Ordinal) -> Feature-Werte
+        self._features_memo: "OrderedDict[int, Tuple[float, ...]]" = OrderedDict()
+        self._features_memo_size = 4096
+        
+        # Bereits gemeldete Fallback-Ursachen: (API, Exception-Klasse)
+        self._reported_failures = set()
+        
+        # Circuit Breaker: nach einem Fehler bis zu diesem Zeitpunkt (monotonic)
+        # direkt die Fallback-Werte verwenden, ohne den Client aufzurufen
+        self._holiday_degraded_until = 0.0
+        self._interest_degraded_until = 0.0
+    
+    def close(self):
+        """Schließt die selbst erzeugten Clients und die gemeinsame Session."""
+        for client in self._owned_clients:
+            client.close()
+        if self._session is not None:
+            self._session.close()
     
     def get_features_for_date(self, date: datetime) -> Dict[str, float]:
         """
@@ -55,51 +153,81 @@ class ExternalFeatureOrchestrator:
         Returns:
             dict mit allen Features (Holidays, Zinsen, Zeit)
         """
+        key = date.toordinal()
+        
+        values = self._features_memo.get(key)
+        if values is not None:
+            self._features_memo.move_to_end(key)
+            return dict(zip(self.FEATURE_NAMES, values))
+        
+        features, complete = self._compute_features(datetime.fromordinal(key))
+        
+        # Nur vollständige Ergebnisse merken (Fallbacks beim nächsten Mal neu versuchen)
+        if complete:
+            self._features_memo[key] = tuple(features[name] for name in self.FEATURE_NAMES)
+            while len(self._features_memo) > self._features_memo_size:
+                self._features_memo.popitem(last=False)
+        
+        return features
+    
+    def _compute_features(self, date: datetime) -> Tuple[Dict[str, float], bool]:
+        """
+        Berechnet alle Features für ein Datum.
+        
+        Returns:
+            (Features, False falls ein Fallback verwendet wurde)
+        """
         features = {}
+        complete = True
+        
+        now = time.monotonic()
         
         # 1. Holiday Features
-        try:
-            holiday_features = self.holiday_client.get_features(date)
-            features.update(holiday_features)
-        except Exception as e:
-            print(f"⚠️  Holiday API failed for {date}: {e}")
-            # Fallback: Nullen
-            features.update({
-                'is_holiday': 0.0,
-                'days_to_next_holiday': 30.0,
-                'days_since_last_holiday': 30.0,
-                'is_holiday_week': 0.0
-            })
+        if now < self._holiday_degraded_until:
+            features.update(_HOLIDAY_FALLBACK)
+            complete = False
+        else:
+            try:
+                features.update(self.holiday_client.get_features(date))
+            except Exception as e:
+                self._report_failure("Holiday", date, e)
+                self._holiday_degraded_until = now + DEGRADED_SECONDS
+                complete = False
+                # Fallback: Nullen
+                features.update(_HOLIDAY_FALLBACK)
         
         # 2. Interest Rate Features
-        try:
-            rate_features = self.interest_client.get_features(date)
-            features.update(rate_features)
-        except Exception as e:
-            print(f"⚠️  Interest API failed for {date}: {e}")
-            # Fallback: Aktuelle durchschnittliche Werte
-            features.update({
-                'ezb_hauptrefinanzierung': 4.50,
-                'bundesanleihe_10j': 2.50,
-                'geldmarktzins_3m': 3.80,
-                'rate_trend_7d': 0.0,
-                'rate_trend_30d': 0.0,
-                'rate_volatility': 0.05
-            })
+        if now < self._interest_degraded_until:
+            features.update(_INTEREST_FALLBACK)
+            complete = False
+        else:
+            try:
+                features.update(self.interest_client.get_features(date))
+            except Exception as e:
+                self._report_failure("Interest", date, e)
+                self._interest_degraded_until = now + DEGRADED_SECONDS
+                complete = False
+                # Fallback: Aktuelle durchschnittliche Werte
+                features.update(_INTEREST_FALLBACK)
         
         # 3. Zeitbasierte Features (ohne API)
-        features.update({
-            'day_of_week': float(date.weekday()),
-            'day_of_month': float(date.day),
-            'month': float(date.month),
-            'quarter': float((date.month - 1) // 3 + 1),
-            'is_weekend': float(date.weekday() >= 5),
-            'is_month_start': float(date.day <= 7),
-            'is_month_end': float(date.day >= 24),
-            'week_of_year': float(date.isocalendar()[1])
-        })
+        features.update(_time_features(date))
         
-        return features
+        return features, complete
+    
+    def _report_failure(self, api: str, when, error: Exception):
+        """
+        Meldet einen API-Fehler (Fallback aktiv).
+        
+        Pro API und Exception-Klasse nur einmal als Warning, danach als Debug,
+        damit ein dauerhaft ausgefallener Dienst das Log nicht pro Datum flutet.
+        """
+        key = (api, type(error).__name__)
+        if key in self._reported_failures:
+            logger.debug("%s API failed for %s: %s", api, when, error)
+        else:
+            self._reported_failures.add(key)
+            logger.warning("%s API failed for %s: %s (using fallback)", api, when, error)
     
     def get_features_for_range(self, start_date: datetime, end_date: datetime) -> pd.DataFrame:
         """
@@ -115,39 +243,144 @@ class ExternalFeatureOrchestrator:
             DataFrame mit allen Features
         """
         # Pre-fetch API Daten (batch für Performance)
-        print(f"📊 Fetching external features: {start_date.date()} → {end_date.date()}")
+        logger.info("Fetching external features: %s → %s", start_date.date(), end_date.date())
         
-        # Holidays vorab laden (ein Request pro Jahr)
-        years = set([start_date.year, end_date.year])
-        for year in years:
-            self.holiday_client.get_holidays(year)
-        
-        # Interest Rates vorab laden (ein Request für gesamten Range)
-        self.interest_client.get_interest_rates(
-            start_date - timedelta(days=30),  # 30 Tage lookback für Trends
-            end_date
-        )
-        
-        # Generiere Features für jeden Tag
         dates = pd.date_range(start_date, end_date, freq='D')
-        features_list = []
+        self._prefetch(range(start_date.year, end_date.year + 1), start_date, end_date)
         
-        for date in dates:
-            features = self.get_features_for_date(date)
-            features['date'] = date
-            features_list.append(features)
+        # Alle Features spaltenweise (vektorisiert über den gesamten Bereich)
+        # in vorab allokierte float32-Arrays mit fester Spaltenreihenfolge
+        n = len(dates)
+        columns = {name: np.empty(n, dtype=np.float32) for name in self.FEATURE_NAMES}
+        for part in (self._holiday_features_for_range(dates),
+                     self._interest_features_for_range(dates, start_date, end_date),
+                     self._time_features_for_range(dates)):
+            for name, values in part.items():
+                columns[name][:] = values
+        columns['date'] = dates
         
-        df = pd.DataFrame(features_list)
+        df = pd.DataFrame(columns)
         
-        print(f"✅ Generated {len(df)} days with {df.shape[1]-1} features")
+        logger.info("Generated %d days with %d features", len(df), df.shape[1] - 1)
         
         return df
     
-    def get_feature_names(self) -> list:
-        """Gibt Liste aller Feature-Namen zurück."""
-        # Generiere Beispiel-Features für einen Tag
-        sample_date = datetime(2025, 1, 1)
-        features = self.get_features_for_date(sample_date)
+    def _prefetch(self, years, start_date: datetime, end_date: datetime):
+        """
+        Lädt Feiertage (alle Jahre) und Zinsdaten parallel vor.
         
-        # Entferne 'date' aus Liste
-        return [k for k in features.keys() if k != 'date']
+        Die Requests sind unabhängig voneinander; die Ergebnisse landen in den
+        Client-Caches und werden danach von den Feature-Berechnungen gelesen.
+        Fehler werden hier nur als Debug geloggt – die Fallbacks greifen beim
+        eigentlichen Abruf.
+        """
+        tasks = [lambda: self.holiday_client.get_holidays_multi(years)]
+        # Gleiches Zeitfenster wie get_features_batch (30 Tage Lookback);
+        # _load_rates wärmt nur den Cache, ohne eine Kopie zu erzeugen
+        tasks.append(lambda: self.interest_client._load_rates(
+            start_date - timedelta(days=30), end_date
+        ))
+        
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = [executor.submit(task) for task in tasks]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    logger.debug("Prefetch failed", exc_info=True)
+    
+    def _holiday_features_for_range(self, dates: pd.DatetimeIndex) -> Dict[str, np.ndarray]:
+        """
+        Holiday Features für alle Tage per Binärsuche auf sortierten Feiertagen.
+        
+        Wie HolidayAPIClient.get_features: nächster/letzter Feiertag jeweils
+        innerhalb desselben Jahres (sonst 365).
+        """
+        n = len(dates)
+        # Tage als date.toordinal() (wie die Feiertags-Ordinals des Clients)
+        days = dates.values.astype('datetime64[D]').astype(np.int64) + _EPOCH_ORDINAL
+        years = dates.year.values
+        
+        days_to_next = np.full(n, 365, dtype=np.int64)
+        days_since_last = np.full(n, 365, dtype=np.int64)
+        is_holiday_week = np.zeros(n, dtype=bool)
+        
+        try:
+            for year in np.unique(years):
+                h_days = self.holiday_client._year_ordinals(int(year)).astype(np.int64)
+                if len(h_days) == 0:
+                    continue
+                
+                in_year = years == year
+                d = days[in_year]
+                
+                # Erster Feiertag >= Tag, letzter Feiertag <= Tag
+                nxt = np.searchsorted(h_days, d, side='left')
+                prv = np.searchsorted(h_days, d, side='right') - 1
+                
+                days_to_next[in_year] = np.where(
+                    nxt < len(h_days), h_days[np.minimum(nxt, len(h_days) - 1)] - d, 365
+                )
+                days_since_last[in_year] = np.where(
+                    prv >= 0, d - h_days[np.maximum(prv, 0)], 365
+                )
+                
+                # Holiday Week: Feiertags-Maske des ganzen Jahres um ±7 Tage
+                # erweitern (Faltung mit 15er-Fenster), dann auf den Bereich schneiden
+                year_start = datetime(int(year), 1, 1).toordinal()
+                mask = np.zeros(datetime(int(year) + 1, 1, 1).toordinal() - year_start, dtype=np.uint8)
+                offsets = h_days - year_start
+                mask[offsets[(offsets >= 0) & (offsets < len(mask))]] = 1
+                week = np.convolve(mask, np.ones(15, dtype=np.uint8), mode='same') > 0
+                is_holiday_week[in_year] = week[d - year_start]
+        except Exception as e:
+            self._report_failure("Holiday", f"{dates[0].date()} → {dates[-1].date()}", e)
+            return {name: np.full(n, value) for name, value in _HOLIDAY_FALLBACK.items()}
+        
+        return {
+            'is_holiday': (days_to_next == 0).astype(float),
+            'days_to_next_holiday': days_to_next.astype(float),
+            'days_since_last_holiday': days_since_last.astype(float),
+            'is_holiday_week': is_holiday_week.astype(float)
+        }
+    
+    def _interest_features_for_range(self, dates: pd.DatetimeIndex,
+                                     start_date: datetime, end_date: datetime) -> Dict[str, np.ndarray]:
+        """Interest Rate Features für alle Tage aus einem Batch (ein Zeitfenster)."""
+        try:
+            batch = self.interest_client.get_features_batch(start_date, end_date)
+            # Tagesgenau zuordnen (Uhrzeiten von Bereich und Zinsdaten ignorieren)
+            batch = batch.set_index(batch['date'].dt.normalize()).reindex(dates.normalize())
+            missing = int(batch[list(_INTEREST_FALLBACK)].isna().any(axis=1).sum())
+            if missing:
+                logger.warning("Interest data missing for %d of %d days (%s → %s), using fallback",
+                               missing, len(dates), dates[0].date(), dates[-1].date())
+            return {
+                name: batch[name].fillna(value).values
+                for name, value in _INTEREST_FALLBACK.items()
+            }
+        except Exception as e:
+            self._report_failure("Interest", f"{dates[0].date()} → {dates[-1].date()}", e)
+            return {name: np.full(len(dates), value) for name, value in _INTEREST_FALLBACK.items()}
+    
+    @staticmethod
+    def _time_features_for_range(dates: pd.DatetimeIndex) -> Dict[str, np.ndarray]:
+        """Zeitbasierte Features über DatetimeIndex-Accessors (ohne Python-Loop, float32)."""
+        day_of_week = dates.dayofweek.values
+        day = dates.day.values
+        month = dates.month.values
+        
+        return {
+            'day_of_week': day_of_week.astype(np.float32),
+            'day_of_month': day.astype(np.float32),
+            'month': month.astype(np.float32),
+            'quarter': ((month - 1) // 3 + 1).astype(np.float32),
+            'is_weekend': (day_of_week >= 5).astype(np.float32),
+            'is_month_start': (day <= 7).astype(np.float32),
+            'is_month_end': (day >= 24).astype(np.float32),
+            'week_of_year': dates.isocalendar().week.values.astype(np.float32)
+        }
+    
+    def get_feature_names(self) -> list:
+        """Gibt Liste aller Feature-Namen zurück (ohne API-Aufrufe)."""
+        return list(self.FEATURE_NAMES)